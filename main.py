@@ -1,12 +1,15 @@
 import asyncio
 import base64
-import json
+import binascii
+import itertools
 import os
 import time
 import uuid
-from pathlib import Path
-from typing import Dict, List, Optional, Set
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
 
+import msgspec
+import orjson
 from aiohttp import web
 
 from astrbot.api import AstrBotConfig, logger
@@ -43,8 +46,64 @@ TASK_ALIASES = {
     "all": "LinkStart",
 }
 
+# 别名查找表：键统一为小写，中文别名不受影响
+_TASK_LOOKUP = {k.lower(): v for k, v in TASK_ALIASES.items()}
+
+# 未知任务时附带的可用任务说明
+_UNKNOWN_TASK_HELP = (
+    "\n\n"
+    "可用任务:\n"
+    "  ALL - 完整一键长草\n"
+    "  Base/基建换班/基建\n"
+    "  WakeUp/开始唤醒\n"
+    "  Combat/刷理智\n"
+    "  Recruiting/自动公招/公招\n"
+    "  Mall/获取信用及购物/信用\n"
+    "  Mission/领取奖励\n"
+    "  AutoRoguelike/自动肉鸽/肉鸽\n"
+    "  Reclamation/生息演算"
+)
+
+# 不追加自动截图的任务类型
+_NO_AUTO_SS = frozenset({"CaptureImage", "CaptureImageNow", "HeartBeat"})
+# 系统任务类型（截图、心跳等），不计入用户任务、不发送完成通知
+_SYSTEM_TASK_TYPES = frozenset({"CaptureImage", "CaptureImageNow", "HeartBeat", "StopTask"})
+
+# 任务 ID: 进程随机前缀 + 自增序号，仅在插件内部用作任务标识
+_TASK_ID_PREFIX = uuid.uuid4().hex[:8]
+_task_counter = itertools.count()
+
+
+def _new_task_id() -> str:
+    """生成新的任务 ID"""
+    return f"{_TASK_ID_PREFIX}-{next(_task_counter)}"
+
+
+# 截图文件头 (PNG / JPEG)
+_IMAGE_SIGNATURES = (b"\x89PNG\r\n\x1a\n", b"\xff\xd8\xff")
+
+
+def _is_image_payload(payload) -> bool:
+    """仅解码 Base64 开头部分，根据文件头判断 payload 是否为截图"""
+    if not isinstance(payload, str) or len(payload) < 12:
+        return False
+    try:
+        header = base64.b64decode(payload[:12], validate=True)
+    except (binascii.Error, ValueError):
+        return False
+    return header.startswith(_IMAGE_SIGNATURES)
+
+
 # HTTP 请求体大小上限，影响截图上报可接收的最大体积
 MAX_REQUEST_MB = 64
+# getTask 请求体仅包含设备与用户标识，使用更严格的上限（字节）
+MAX_GET_TASK_BYTES = 64 * 1024
+
+# JSON 响应体超过该字节数时启用压缩（按客户端 Accept-Encoding 协商）
+COMPRESS_MIN_BYTES = 1024
+
+# 绑定数据合并写盘的间隔（秒）
+SAVE_INTERVAL = 1.0
 
 
 @register(
@@ -76,10 +135,12 @@ class MAAPlugin(Star):
         self.bindings: Dict[str, dict] = {}
         # 反向索引: {device_id: sender_id}
         self.device_to_sender: Dict[str, str] = {}
-        # 任务队列: {device_id: [task1, task2, ...]}
-        self.task_queues: Dict[str, List[dict]] = {}
-        # 已执行的任务 ID: {device_id: set()}
-        self.executed_tasks: Dict[str, Set[str]] = {}
+        # 设备信息索引 (与 bindings 中为同一对象): {device_id: {"umo": str, "alias": str}}
+        self.device_to_info: Dict[str, dict] = {}
+        # 待执行任务队列: {device_id: deque([task1, task2, ...])}，任务完成后即出队
+        self.task_queues: Dict[str, Deque[dict]] = {}
+        # 任务队列版本号，队列变化时递增，用作 getTask 的 ETag: {device_id: int}
+        self.queue_version: Dict[str, int] = {}
         # 设备最后活跃时间: {device_id: timestamp}
         self.device_last_seen: Dict[str, float] = {}
         # 任务信息映射: {task_id: {"name": str, "type": str, "device_id": str, "umo": str}}
@@ -90,18 +151,31 @@ class MAAPlugin(Star):
         self.runner: Optional[web.AppRunner] = None
         self.site: Optional[web.TCPSite] = None
 
+        # 绑定数据写盘: 修改时仅标记，由后台任务合并后在线程池中写入
+        self._dirty = False
+        self._closing = asyncio.Event()
+        self._flush_task: Optional[asyncio.Task] = None
+
         # 加载持久化数据
         self._load_data()
 
     def _load_data(self):
         """从文件加载持久化数据"""
-        bindings_file = self.data_dir / "bindings.json"
-        if bindings_file.exists():
+        bindings_file = self.data_dir / "bindings.msgpack"
+        legacy_file = self.data_dir / "bindings.json"
+        if bindings_file.exists() or legacy_file.exists():
             try:
-                with open(bindings_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                
                 migrated = False
+                if bindings_file.exists():
+                    with open(bindings_file, "rb") as f:
+                        data = msgspec.msgpack.decode(f.read(), type=Dict[str, dict])
+                else:
+                    # 旧版 JSON 存储迁移到 msgpack，原文件保留作为备份
+                    with open(legacy_file, "rb") as f:
+                        data = orjson.loads(f.read())
+                    migrated = True
+                    logger.info("检测到 bindings.json，将迁移为 bindings.msgpack")
+
                 for sender_id, info in data.items():
                     if "device_id" in info:
                         # 旧版格式迁移到新版格式
@@ -125,34 +199,75 @@ class MAAPlugin(Star):
 
                 # 重建反向索引
                 for sender_id, user_data in self.bindings.items():
-                    for device_id in user_data.get("devices", {}).keys():
+                    for device_id, device_info in user_data.get("devices", {}).items():
                         self.device_to_sender[device_id] = sender_id
+                        self.device_to_info[device_id] = device_info
                         
                 logger.info(f"已加载 {len(self.bindings)} 个用户的设备绑定")
             except Exception as e:
                 logger.error(f"加载绑定数据失败: {e}")
 
     def _save_data(self):
-        """保存持久化数据到文件"""
-        bindings_file = self.data_dir / "bindings.json"
+        """标记绑定数据待保存，实际写入由后台任务完成"""
+        self._dirty = True
+
+    def _write_bindings(self, content: bytes):
+        """写入绑定数据文件（在线程池中执行）
+
+        先写入临时文件再原子替换，避免写入中途崩溃导致文件损坏
+        """
+        bindings_file = self.data_dir / "bindings.msgpack"
+        tmp_file = bindings_file.with_suffix(".msgpack.tmp")
+        with open(tmp_file, "wb") as f:
+            f.write(content)
+        os.replace(tmp_file, bindings_file)
+
+    async def _flush_data(self):
+        """如有未保存的修改，将绑定数据写入文件"""
+        if not self._dirty:
+            return
+        self._dirty = False
+        # 在事件循环内完成序列化，避免线程中读取正在被修改的字典
+        content = msgspec.msgpack.encode(self.bindings)
         try:
-            with open(bindings_file, "w", encoding="utf-8") as f:
-                json.dump(self.bindings, f, ensure_ascii=False, indent=2)
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._write_bindings, content)
         except Exception as e:
+            # 保留修改标记，下次循环重试
+            self._dirty = True
             logger.error(f"保存绑定数据失败: {e}")
 
-    def _get_active_device(self, sender_id: str) -> Optional[str]:
-        """获取用户的当前活跃设备 ID"""
-        if sender_id in self.bindings:
-            user_data = self.bindings[sender_id]
+    async def _flush_loop(self):
+        """后台定期合并写入绑定数据，插件停止时做最后一次写入"""
+        while not self._closing.is_set():
+            try:
+                await asyncio.wait_for(self._closing.wait(), timeout=SAVE_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            await self._flush_data()
+
+    def _resolve(self, event: AstrMessageEvent) -> Tuple[str, Optional[dict]]:
+        """获取指令发送者 ID 及其绑定数据"""
+        sender_id = event.get_sender_id()
+        return sender_id, self.bindings.get(sender_id)
+
+    def _resolve_active(
+        self, event: AstrMessageEvent
+    ) -> Tuple[Optional[str], Optional[dict]]:
+        """获取指令发送者当前活跃设备的 ID 及设备信息"""
+        _, user_data = self._resolve(event)
+        if user_data:
             active_id = user_data.get("active_device")
-            if active_id and active_id in user_data.get("devices", {}):
-                return active_id
-        return None
+            device_info = user_data.get("devices", {}).get(active_id) if active_id else None
+            if device_info is not None:
+                return active_id, device_info
+        return None, None
 
     @filter.on_astrbot_loaded()
     async def initialize(self):
         """插件初始化，启动 HTTP 服务器"""
+        if not self._flush_task:
+            self._flush_task = asyncio.create_task(self._flush_loop())
         await self._start_http_server()
 
     async def _start_http_server(self):
@@ -166,7 +281,8 @@ class MAAPlugin(Star):
         self.app.router.add_post("/maa/getTask", self._handle_get_task)
         self.app.router.add_post("/maa/reportStatus", self._handle_report_status)
 
-        self.runner = web.AppRunner(self.app)
+        # MAA 会频繁轮询 getTask，关闭逐请求的访问日志
+        self.runner = web.AppRunner(self.app, access_log=None)
         await self.runner.setup()
 
         try:
@@ -179,11 +295,74 @@ class MAAPlugin(Star):
         except OSError as e:
             logger.error(f"HTTP 服务启动失败，端口 {self.http_port} 可能被占用: {e}")
 
-    async def _read_json(self, request: web.Request, endpoint: str) -> Optional[dict]:
-        """读取 JSON 请求体"""
+    @staticmethod
+    def _json_response(
+        data: dict, status: int = 200, headers: Optional[Dict[str, str]] = None
+    ) -> web.Response:
+        """使用 orjson 编码 JSON 响应，较大的响应体启用压缩"""
+        body = orjson.dumps(data)
+        response = web.Response(
+            body=body,
+            status=status,
+            headers=headers,
+            content_type="application/json",
+        )
+        if len(body) >= COMPRESS_MIN_BYTES:
+            response.enable_compression()
+        return response
+
+    @staticmethod
+    def _body_too_large(request: web.Request, endpoint: str, max_size: int) -> bool:
+        """根据 Content-Length 在读取前拒绝过大的请求体"""
+        if request.content_length is not None and request.content_length > max_size:
+            logger.warning(
+                f"{endpoint} 请求体过大: content_length={request.content_length}, "
+                f"max_size={max_size}"
+            )
+            return True
+        return False
+
+    async def _read_limited(
+        self, request: web.Request, endpoint: str, max_size: int
+    ) -> bytes:
+        """最多读取 max_size 字节的请求体，超出时抛出 HTTPRequestEntityTooLarge
+
+        分块读取并在超过上限时立即停止，不依赖客户端提供 Content-Length
+        """
+        if self._body_too_large(request, endpoint, max_size):
+            raise web.HTTPRequestEntityTooLarge(
+                max_size=max_size, actual_size=request.content_length
+            )
+        body = bytearray()
+        while True:
+            chunk = await request.content.read(max_size + 1 - len(body))
+            if not chunk:
+                break
+            body += chunk
+            if len(body) > max_size:
+                logger.warning(f"{endpoint} 请求体过大: 已读取超过 max_size={max_size}")
+                raise web.HTTPRequestEntityTooLarge(
+                    max_size=max_size, actual_size=len(body)
+                )
+        return bytes(body)
+
+    async def _read_json(
+        self, request: web.Request, endpoint: str, max_size: Optional[int] = None
+    ) -> Optional[dict]:
+        """读取 JSON 请求体
+
+        指定 max_size 时超出上限抛出 HTTPRequestEntityTooLarge，
+        否则请求体大小由 client_max_size 限制
+        """
         try:
-            return await request.json()
+            if max_size is not None:
+                raw = await self._read_limited(request, endpoint, max_size)
+            else:
+                raw = await request.read()
+            return orjson.loads(raw)
         except web.HTTPRequestEntityTooLarge:
+            if max_size is not None:
+                raise
             logger.warning(
                 f"{endpoint} 请求体过大: content_length={request.content_length}, "
                 f"max_request_mb={MAX_REQUEST_MB}"
@@ -198,15 +377,18 @@ class MAAPlugin(Star):
 
     async def _handle_get_task(self, request: web.Request) -> web.Response:
         """处理 MAA 获取任务请求"""
-        data = await self._read_json(request, "getTask")
+        try:
+            data = await self._read_json(request, "getTask", MAX_GET_TASK_BYTES)
+        except web.HTTPRequestEntityTooLarge:
+            return self._json_response({"tasks": []}, status=413)
         if not data:
-            return web.json_response({"tasks": []}, status=400)
+            return self._json_response({"tasks": []}, status=400)
 
         device_id = data.get("device", "")
         user_id = data.get("user", "")
 
         if not device_id:
-            return web.json_response({"tasks": []}, status=400)
+            return self._json_response({"tasks": []}, status=400)
 
         # 更新设备最后活跃时间
         self.device_last_seen[device_id] = time.time()
@@ -216,19 +398,23 @@ class MAAPlugin(Star):
         if not sender_id:
             # 设备未绑定，返回空任务但记录日志
             logger.debug(f"未绑定设备请求: device={device_id}, user={user_id}")
-            return web.json_response({"tasks": []})
+            return self._json_response({"tasks": []})
 
-        # 获取任务队列
-        tasks = self.task_queues.get(device_id, [])
-        executed = self.executed_tasks.get(device_id, set())
+        # 队列未变化时返回 304，省去响应体编码
+        etag = f'"{_TASK_ID_PREFIX}-{self.queue_version.get(device_id, 0)}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
 
-        # 过滤已执行的任务
-        pending_tasks = [t for t in tasks if t["id"] not in executed]
-
-        return web.json_response({"tasks": pending_tasks})
+        # 队列中只保留待执行的任务
+        return self._json_response(
+            {"tasks": list(self.task_queues.get(device_id, ()))}, headers={"ETag": etag}
+        )
 
     async def _handle_report_status(self, request: web.Request) -> web.Response:
         """处理 MAA 汇报任务状态"""
+        if self._body_too_large(request, "reportStatus", MAX_REQUEST_MB * 1024 * 1024):
+            return web.Response(status=413)
+
         data = await self._read_json(request, "reportStatus")
         if not data:
             return web.Response(status=400)
@@ -247,40 +433,37 @@ class MAAPlugin(Star):
         task_type = task_info.get("type", "")
         task_umo = task_info.get("umo", "")
 
-        # 标记任务已执行
-        if device_id not in self.executed_tasks:
-            self.executed_tasks[device_id] = set()
-        self.executed_tasks[device_id].add(task_id)
-
         # 从队列移除已完成的任务
-        if device_id in self.task_queues:
-            self.task_queues[device_id] = [
-                t for t in self.task_queues[device_id] if t["id"] != task_id
-            ]
+        queue = self.task_queues.get(device_id)
+        if queue:
+            for task in queue:
+                if task["id"] == task_id:
+                    queue.remove(task)
+                    self._bump_queue_version(device_id)
+                    break
 
         # 清理已完成的任务信息
         if task_id in self.task_info:
             del self.task_info[task_id]
 
         # 计算剩余用户任务数（排除系统任务如截图、心跳等）
-        system_task_types = {"CaptureImage", "CaptureImageNow", "HeartBeat", "StopTask"}
         remaining_user_tasks = len([
-            t for t in self.task_queues.get(device_id, [])
-            if t.get("type") not in system_task_types
+            t for t in self.task_queues.get(device_id, ())
+            if t.get("type") not in _SYSTEM_TASK_TYPES
         ])
 
         # 判断是否应该发送通知
-        is_system_task = task_type in system_task_types
+        is_system_task = task_type in _SYSTEM_TASK_TYPES
         # 非系统任务时：每任务通知模式直接通知，否则仅当所有任务完成才通知
         should_notify = not is_system_task and (
             self.notify_on_each_task or remaining_user_tasks == 0
         )
 
-        # 查找对应用户并发送通知
-        sender_id = self.device_to_sender.get(device_id)
-        if sender_id and sender_id in self.bindings:
-            user_data = self.bindings[sender_id]
-            device_info = user_data.get("devices", {}).get(device_id, {})
+        is_screenshot = _is_image_payload(payload)
+
+        # 查找对应设备并发送通知
+        device_info = self.device_to_info.get(device_id)
+        if device_info is not None:
             alias = device_info.get("alias", device_id[:8])
 
             # 优先使用任务级别的回复目标；缺失时回退到设备绑定的 umo
@@ -296,7 +479,7 @@ class MAAPlugin(Star):
                         message = f"✅ MAA 所有任务已完成 [{alias}]\n最后完成: {task_name}\n状态: {status}"
 
                     # 如果有截图数据（Base64），发送图片
-                    if payload and len(payload) > 100:  # 可能是截图
+                    if is_screenshot:
                         try:
                             await self._send_screenshot(umo, payload, message)
                         except Exception as e:
@@ -306,7 +489,7 @@ class MAAPlugin(Star):
                     else:
                         chain = MessageChain().message(message)
                         await self.context.send_message(umo, chain)
-                elif payload and len(payload) > 100:
+                elif is_screenshot:
                     # 截图任务：仅发送截图，不发送通知文本
                     try:
                         await self._send_screenshot(umo, payload, "")
@@ -316,82 +499,68 @@ class MAAPlugin(Star):
         return web.Response(status=200)
 
     async def _send_screenshot(self, umo: str, base64_data: str, message: str):
-        """解码并发送截图"""
-        # 解码 Base64
-        image_data = base64.b64decode(base64_data)
-
-        # 保存为临时文件
-        temp_dir = self.data_dir / "temp"
-        temp_dir.mkdir(exist_ok=True)
-        temp_file = temp_dir / f"screenshot_{uuid.uuid4().hex[:8]}.png"
-
-        with open(temp_file, "wb") as f:
-            f.write(image_data)
-
-        # 发送消息和图片
+        """发送截图（Base64 数据直接放入消息链，无需落盘）"""
         chain = MessageChain().message(message) if message else MessageChain()
-        chain = chain.file_image(str(temp_file))
+        chain = chain.base64_image(base64_data)
         await self.context.send_message(umo, chain)
 
-        # 延迟删除临时文件
-        asyncio.create_task(self._delete_temp_file(temp_file))
+    def _bump_queue_version(self, device_id: str):
+        """任务队列发生变化，递增队列版本号"""
+        self.queue_version[device_id] = self.queue_version.get(device_id, 0) + 1
 
-    async def _delete_temp_file(self, file_path: Path, delay: float = 30.0):
-        """延迟删除临时文件"""
-        await asyncio.sleep(delay)
-        try:
-            if file_path.exists():
-                file_path.unlink()
-        except Exception as e:
-            logger.debug(f"删除临时文件失败: {e}")
+    def _edit_queue(self, device_id: str) -> Deque[dict]:
+        """获取设备任务队列用于修改（不存在时创建），并递增队列版本号"""
+        self._bump_queue_version(device_id)
+        return self.task_queues.setdefault(device_id, deque())
 
-    def _add_task(
+    def _add_tasks(
         self,
         device_id: str,
-        task_type: str,
-        task_name: str = "",
-        params: str = "",
+        tasks: List[Tuple[str, str]],
         umo: str = "",
-    ) -> str:
-        """添加任务到队列，返回任务 ID
-        
+    ) -> List[str]:
+        """批量添加任务到队列，返回任务 ID 列表
+
+        开启自动截图时仅在整批任务之后追加一次截图任务；
+        每任务通知模式下则在每个任务后追加截图。
+
         Args:
             device_id: 设备 ID
-            task_type: 任务类型
-            task_name: 任务名称（用于通知显示）
-            params: 任务参数
+            tasks: (任务名称, 任务类型) 列表，任务名称用于通知显示
+            umo: 任务完成通知的回复目标
         """
-        task_id = str(uuid.uuid4())
-        task = {"id": task_id, "type": task_type}
-        if params:
-            task["params"] = params
-
-        if device_id not in self.task_queues:
-            self.task_queues[device_id] = []
-
-        self.task_queues[device_id].append(task)
-
-        # 存储任务信息以便完成时获取任务名
-        self.task_info[task_id] = {
-            "name": task_name or task_type,
-            "type": task_type,
-            "device_id": device_id,
-            "umo": umo,
-        }
-
-        # 如果开启自动截图，追加截图任务
-        if self.auto_screenshot and task_type not in ("CaptureImage", "CaptureImageNow", "HeartBeat"):
-            screenshot_task_id = str(uuid.uuid4())
-            screenshot_task = {"id": screenshot_task_id, "type": "CaptureImage"}
-            self.task_queues[device_id].append(screenshot_task)
-            self.task_info[screenshot_task_id] = {
-                "name": "自动截图",
-                "type": "CaptureImage",
+        task_ids = []
+        batch = []
+        last_index = len(tasks) - 1
+        for i, (task_name, task_type) in enumerate(tasks):
+            task_id = _new_task_id()
+            task_ids.append(task_id)
+            batch.append({"id": task_id, "type": task_type})
+            # 存储任务信息以便完成时获取任务名
+            self.task_info[task_id] = {
+                "name": task_name or task_type,
+                "type": task_type,
                 "device_id": device_id,
                 "umo": umo,
             }
 
-        return task_id
+            # 如果开启自动截图，追加截图任务
+            if (
+                self.auto_screenshot
+                and (self.notify_on_each_task or i == last_index)
+                and task_type not in _NO_AUTO_SS
+            ):
+                screenshot_task_id = _new_task_id()
+                batch.append({"id": screenshot_task_id, "type": "CaptureImage"})
+                self.task_info[screenshot_task_id] = {
+                    "name": "自动截图",
+                    "type": "CaptureImage",
+                    "device_id": device_id,
+                    "umo": umo,
+                }
+
+        self._edit_queue(device_id).extend(batch)
+        return task_ids
 
     # ==================== 指令处理 ====================
 
@@ -407,14 +576,15 @@ class MAAPlugin(Star):
         用法: /maa bind <设备标识符> [设备别名]
         设备标识符可在 MAA 设置中查看
         """
-        sender_id = event.get_sender_id()
+        sender_id, user_data = self._resolve(event)
 
         # 检查设备是否已被其他用户绑定
         if device_id in self.device_to_sender and self.device_to_sender[device_id] != sender_id:
             yield event.plain_result("❌ 错误：该设备已被其他用户绑定")
             return
 
-        user_data = self.bindings.setdefault(sender_id, {"active_device": "", "devices": {}})
+        if user_data is None:
+            user_data = self.bindings[sender_id] = {"active_device": "", "devices": {}}
         
         if device_id in user_data["devices"]:
             # 如果已存在，允许更新别名
@@ -430,16 +600,18 @@ class MAAPlugin(Star):
             alias = f"设备{len(user_data['devices']) + 1}"
 
         # 保存绑定信息
-        user_data["devices"][device_id] = {
+        device_info = {
             "umo": event.unified_msg_origin,
             "alias": alias
         }
+        user_data["devices"][device_id] = device_info
         
         # 如果是第一个设备，或者未设置活跃设备，将其设为活跃设备
         if not user_data["active_device"]:
             user_data["active_device"] = device_id
             
         self.device_to_sender[device_id] = sender_id
+        self.device_to_info[device_id] = device_info
         self._save_data()
 
         base_url = self.custom_address if self.custom_address else f"<你的地址>:{self.http_port}"
@@ -460,13 +632,12 @@ class MAAPlugin(Star):
         
         用法: /maa unbind [设备ID或别名]
         """
-        sender_id = event.get_sender_id()
+        sender_id, user_data = self._resolve(event)
 
-        if sender_id not in self.bindings or not self.bindings[sender_id]["devices"]:
+        if not user_data or not user_data["devices"]:
             yield event.plain_result("❌ 错误：尚未绑定任何设备")
             return
 
-        user_data = self.bindings[sender_id]
         devices = user_data["devices"]
 
         target_device_id = None
@@ -491,12 +662,12 @@ class MAAPlugin(Star):
         
         # 清理数据
         del self.device_to_sender[target_device_id]
+        del self.device_to_info[target_device_id]
         del devices[target_device_id]
         
         if target_device_id in self.task_queues:
             del self.task_queues[target_device_id]
-        if target_device_id in self.executed_tasks:
-            del self.executed_tasks[target_device_id]
+            self._bump_queue_version(target_device_id)
 
         # 如果解绑的是当前活跃设备，自动切换到其他设备（如果有）
         if user_data["active_device"] == target_device_id:
@@ -512,9 +683,9 @@ class MAAPlugin(Star):
         self._save_data()
 
         msg = f"✅ 已解绑设备: {alias} ({target_device_id[:8]}...)"
-        if sender_id in self.bindings and self.bindings[sender_id]["active_device"]:
-            new_active = self.bindings[sender_id]['active_device']
-            new_alias = self.bindings[sender_id]['devices'][new_active].get('alias', '')
+        new_active = user_data["active_device"]
+        if new_active:
+            new_alias = devices[new_active].get('alias', '')
             msg += f"\n当前活跃设备已切换为: {new_alias} ({new_active[:8]}...)"
             
         yield event.plain_result(msg)
@@ -522,23 +693,22 @@ class MAAPlugin(Star):
     @maa.command("list")
     async def maa_list(self, event: AstrMessageEvent):
         """列出所有绑定的设备"""
-        sender_id = event.get_sender_id()
+        _, user_data = self._resolve(event)
 
-        if sender_id not in self.bindings or not self.bindings[sender_id]["devices"]:
+        if not user_data or not user_data["devices"]:
             yield event.plain_result("ℹ️ 尚未绑定任何设备")
             return
 
-        user_data = self.bindings[sender_id]
         devices = user_data["devices"]
         active_device = user_data["active_device"]
 
         lines = ["📱 已绑定的 MAA 设备列表："]
+        now = time.time()
         for d_id, info in devices.items():
             alias = info.get("alias", "")
             
             # 获取状态
             last_seen = self.device_last_seen.get(d_id, 0)
-            now = time.time()
             if last_seen > 0:
                 elapsed = now - last_seen
                 if elapsed < 10:
@@ -562,13 +732,12 @@ class MAAPlugin(Star):
         
         用法: /maa rename <设备ID或旧别名> <新别名>
         """
-        sender_id = event.get_sender_id()
+        _, user_data = self._resolve(event)
 
-        if sender_id not in self.bindings or not self.bindings[sender_id]["devices"]:
+        if not user_data or not user_data["devices"]:
             yield event.plain_result("❌ 错误：尚未绑定任何设备")
             return
 
-        user_data = self.bindings[sender_id]
         devices = user_data["devices"]
 
         target_device_id = None
@@ -593,13 +762,12 @@ class MAAPlugin(Star):
         
         用法: /maa switch <设备ID或别名>
         """
-        sender_id = event.get_sender_id()
+        _, user_data = self._resolve(event)
 
-        if sender_id not in self.bindings or not self.bindings[sender_id]["devices"]:
+        if not user_data or not user_data["devices"]:
             yield event.plain_result("❌ 错误：尚未绑定任何设备")
             return
 
-        user_data = self.bindings[sender_id]
         devices = user_data["devices"]
 
         target_device_id = None
@@ -621,15 +789,13 @@ class MAAPlugin(Star):
     @maa.command("status")
     async def maa_status(self, event: AstrMessageEvent):
         """查看当前设备状态"""
-        sender_id = event.get_sender_id()
-        device_id = self._get_active_device(sender_id)
+        device_id, device_info = self._resolve_active(event)
 
         if not device_id:
             yield event.plain_result("❌ 错误：尚未绑定设备或未设置活跃设备\n使用 /maa bind <设备ID> 绑定")
             return
 
-        user_data = self.bindings[sender_id]
-        alias = user_data["devices"][device_id].get("alias", "")
+        alias = device_info.get("alias", "")
 
         # 检查设备在线状态
         last_seen = self.device_last_seen.get(device_id, 0)
@@ -646,7 +812,7 @@ class MAAPlugin(Star):
             status = "⚪ 从未连接"
 
         # 任务队列状态
-        pending = len(self.task_queues.get(device_id, []))
+        pending = len(self.task_queues.get(device_id, ()))
 
         yield event.plain_result(
             f"📊 MAA 设备状态 [{alias}]\n\n"
@@ -669,14 +835,13 @@ class MAAPlugin(Star):
           Recruiting/自动公招/公招, Mall/获取信用及购物/信用,
           Mission/领取奖励, AutoRoguelike/自动肉鸽/肉鸽, Reclamation/生息演算
         """
-        sender_id = event.get_sender_id()
-        device_id = self._get_active_device(sender_id)
+        device_id, device_info = self._resolve_active(event)
 
         if not device_id:
             yield event.plain_result("❌ 错误：请先绑定设备: /maa bind <设备ID>")
             return
 
-        alias = self.bindings[sender_id]["devices"][device_id].get("alias", "")
+        alias = device_info.get("alias", "")
 
         # 解析任务列表（英文逗号分隔）
         task_names = [t.strip() for t in tasks.split(",") if t.strip()]
@@ -688,31 +853,15 @@ class MAAPlugin(Star):
         task_types = []
         for name in task_names:
             # 查找映射（键值不区分大小写，中文精确匹配）
-            task_type = TASK_ALIASES.get(name.lower()) or TASK_ALIASES.get(name)
+            task_type = _TASK_LOOKUP.get(name.lower())
             if not task_type:
-                yield event.plain_result(
-                    f"❌ 错误：未知任务: {name}\n\n"
-                    f"可用任务:\n"
-                    f"  ALL - 完整一键长草\n"
-                    f"  Base/基建换班/基建\n"
-                    f"  WakeUp/开始唤醒\n"
-                    f"  Combat/刷理智\n"
-                    f"  Recruiting/自动公招/公招\n"
-                    f"  Mall/获取信用及购物/信用\n"
-                    f"  Mission/领取奖励\n"
-                    f"  AutoRoguelike/自动肉鸽/肉鸽\n"
-                    f"  Reclamation/生息演算"
-                )
+                yield event.plain_result(f"❌ 错误：未知任务: {name}{_UNKNOWN_TASK_HELP}")
                 return
             task_types.append((name, task_type))
 
         # 添加任务到队列
-        added_tasks = []
-        for name, task_type in task_types:
-            task_id = self._add_task(
-                device_id, task_type, task_name=name, umo=event.unified_msg_origin
-            )
-            added_tasks.append(f"• {name} ({task_type})")
+        self._add_tasks(device_id, task_types, umo=event.unified_msg_origin)
+        added_tasks = [f"• {name} ({task_type})" for name, task_type in task_types]
 
         yield event.plain_result(
             f"✅ 已添加 {len(added_tasks)} 个任务到设备 [{alias}]\n\n"
@@ -729,22 +878,19 @@ class MAAPlugin(Star):
     @maa.command("screenshot", alias={"cap", "ss"})
     async def maa_screenshot(self, event: AstrMessageEvent):
         """获取当前截图"""
-        sender_id = event.get_sender_id()
-        device_id = self._get_active_device(sender_id)
+        device_id, device_info = self._resolve_active(event)
 
         if not device_id:
             yield event.plain_result("❌ 错误：请先绑定设备: /maa bind <设备ID>")
             return
 
-        alias = self.bindings[sender_id]["devices"][device_id].get("alias", "")
+        alias = device_info.get("alias", "")
         
         # 使用立即截图任务，不等待队列
-        task_id = str(uuid.uuid4())
+        task_id = _new_task_id()
         task = {"id": task_id, "type": "CaptureImageNow"}
 
-        if device_id not in self.task_queues:
-            self.task_queues[device_id] = []
-        self.task_queues[device_id].insert(0, task)  # 插入队首
+        self._edit_queue(device_id).appendleft(task)  # 插入队首
         self.task_info[task_id] = {
             "name": "截图",
             "type": "CaptureImageNow",
@@ -757,21 +903,18 @@ class MAAPlugin(Star):
     @maa.command("stop")
     async def maa_stop(self, event: AstrMessageEvent):
         """停止当前任务"""
-        sender_id = event.get_sender_id()
-        device_id = self._get_active_device(sender_id)
+        device_id, device_info = self._resolve_active(event)
 
         if not device_id:
             yield event.plain_result("❌ 错误：请先绑定设备: /maa bind <设备ID>")
             return
 
-        alias = self.bindings[sender_id]["devices"][device_id].get("alias", "")
+        alias = device_info.get("alias", "")
 
-        task_id = str(uuid.uuid4())
+        task_id = _new_task_id()
         task = {"id": task_id, "type": "StopTask"}
 
-        if device_id not in self.task_queues:
-            self.task_queues[device_id] = []
-        self.task_queues[device_id].insert(0, task)
+        self._edit_queue(device_id).appendleft(task)
         self.task_info[task_id] = {
             "name": "停止任务",
             "type": "StopTask",
@@ -784,17 +927,17 @@ class MAAPlugin(Star):
     @maa.command("clear")
     async def maa_clear(self, event: AstrMessageEvent):
         """清空当前设备的任务队列"""
-        sender_id = event.get_sender_id()
-        device_id = self._get_active_device(sender_id)
+        device_id, device_info = self._resolve_active(event)
 
         if not device_id:
             yield event.plain_result("❌ 错误：请先绑定设备: /maa bind <设备ID>")
             return
 
-        alias = self.bindings[sender_id]["devices"][device_id].get("alias", "")
+        alias = device_info.get("alias", "")
 
         # 清空该设备的待执行任务与对应任务信息
-        self.task_queues[device_id] = []
+        self.task_queues[device_id] = deque()
+        self._bump_queue_version(device_id)
         self.task_info = {
             k: v for k, v in self.task_info.items() if v.get("device_id") != device_id
         }
@@ -804,21 +947,18 @@ class MAAPlugin(Star):
     @maa.command("heartbeat", alias={"ping"})
     async def maa_heartbeat(self, event: AstrMessageEvent):
         """发送心跳检测"""
-        sender_id = event.get_sender_id()
-        device_id = self._get_active_device(sender_id)
+        device_id, device_info = self._resolve_active(event)
 
         if not device_id:
             yield event.plain_result("❌ 错误：请先绑定设备: /maa bind <设备ID>")
             return
 
-        alias = self.bindings[sender_id]["devices"][device_id].get("alias", "")
+        alias = device_info.get("alias", "")
         
-        task_id = str(uuid.uuid4())
+        task_id = _new_task_id()
         task = {"id": task_id, "type": "HeartBeat"}
 
-        if device_id not in self.task_queues:
-            self.task_queues[device_id] = []
-        self.task_queues[device_id].insert(0, task)
+        self._edit_queue(device_id).appendleft(task)
         self.task_info[task_id] = {
             "name": "心跳检测",
             "type": "HeartBeat",
@@ -829,7 +969,17 @@ class MAAPlugin(Star):
         yield event.plain_result(f"💓 心跳检测已发送到设备 [{alias}]，等待 MAA 返回当前任务状态")
 
     async def terminate(self):
-        """插件销毁，停止 HTTP 服务器"""
+        """插件销毁，保存绑定数据并停止 HTTP 服务器"""
+        # 先停止后台写盘并保存未写入的修改，避免 HTTP 服务停止失败或超时导致数据丢失
+        if self._flush_task:
+            self._closing.set()
+            try:
+                await self._flush_task
+            except Exception as e:
+                logger.error(f"停止绑定数据写盘任务时发生错误: {e}")
+            self._flush_task = None
+        await self._flush_data()
+
         logger.info(f"正在停止 MAA HTTP 服务 (端口: {self.http_port})...")
         try:
             # 使用 asyncio.wait_for 以确保停止操作不会永久挂起